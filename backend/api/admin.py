@@ -1,8 +1,11 @@
 from django.contrib.admin import ModelAdmin, TabularInline, register, site
+from django.db import transaction
 from django.utils.safestring import mark_safe
 
+from recipes.cache import bump_recipe_ingredients_version
 from recipes.models import (Tag, Ingredient, Favorite,
                             Recipe, ShoppingCart)
+from recipes.search import update_search_index
 
 site.site_header = 'Администрирование Foodgram'
 EMPTY_VALUE_DISPLAY = 'Значение не указано'
@@ -50,6 +53,11 @@ class RecipeAdmin(ModelAdmin):
     inlines = (IngredientInLine,)
     empty_valuse_display = EMPTY_VALUE_DISPLAY
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_index(Recipe.objects.filter(pk=form.instance.pk))
+        transaction.on_commit(bump_recipe_ingredients_version)
+
     def get_ingredients(self, obj):
         return ', '.join(
             ingredient.ingredient.name
@@ -57,13 +65,14 @@ class RecipeAdmin(ModelAdmin):
         )
 
     def get_count_favourites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     def get_image(self, obj):
         return mark_safe(f'<img src={obj.image.url} width="80" height="30"')
 
     get_image.short_description = 'Изображение'
     get_count_favourites.short_description = 'Добавили в избранное'
+    get_count_favourites.admin_order_field = 'favorites_count'
     get_ingredients.short_description = 'Ингредиенты'
 
 
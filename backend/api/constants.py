@@ -1,2 +1,31 @@
 PAGINATION = 6
-MIN_INGR = 0
+SHOPPING_CART_CHUNK_SIZE = 500
+SHOPPING_CART_DEFAULT_FORMAT = 'txt'
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60 * 24
+SHOPPING_CART_CACHE_MAX_SIZE = 1024 * 1024
+AUTOCOMPLETE_LIMIT = 10
+MAX_AUTOCOMPLETE_LIMIT = 50
+TAGS_MAX_AGE = 60 * 60 * 24
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+MAX_IMAGE_DIMENSION = 8000
+IMAGE_DECODE_CHUNK_SIZE = 64 * 1024
+IMAGE_SPOOL_SIZE = 1024 * 1024
+LIST_IMAGE_RENDITION = 'card'
+RENDITION_IMAGE_FORMAT = 'jpeg'
+SRCSET_IMAGE_FORMAT = 'webp'
+PAGINATION_MODE_PARAM = 'pagination'
+CURSOR_PAGINATION = 'cursor'
+COUNT_CACHE_TIMEOUT = 30
+ESTIMATE_CACHE_TIMEOUT = 60 * 5
+APPROXIMATE_COUNT_THRESHOLD = 10000
+METRICS_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+POPULAR_ORDERING = 'popular'
+RECIPE_ORDERING_CHOICES = (
+    (POPULAR_ORDERING, 'По числу добавлений в избранное'),
+)
+MAX_COOKABLE_INGREDIENTS = 100
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_MARGIN = 50
+PDF_FONT_SIZE = 12
+PDF_LEADING = 16
+PDF_CHUNK_SIZE = 64 * 1024
@@ -0,0 +1,118 @@
+import base64
+import binascii
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, ImageFile
+from rest_framework import serializers
+
+from api.constants import (IMAGE_DECODE_CHUNK_SIZE, IMAGE_SPOOL_SIZE,
+                           MAX_IMAGE_DIMENSION, MAX_IMAGE_SIZE,
+                           RENDITION_IMAGE_FORMAT, SRCSET_IMAGE_FORMAT)
+
+
+class RecipeImageField(Base64ImageField):
+    """Base64-изображение, декодируемое по частям с ранними проверками"""
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        _, _, base64_data = base64_data.rpartition(';base64,')
+        if len(base64_data) // 4 * 3 > MAX_IMAGE_SIZE:
+            raise serializers.ValidationError(
+                'Размер изображения не может быть больше '
+                f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ'
+            )
+        file = SpooledTemporaryFile(max_size=IMAGE_SPOOL_SIZE)
+        parser = ImageFile.Parser()
+        try:
+            for start in range(0, len(base64_data), IMAGE_DECODE_CHUNK_SIZE):
+                chunk = base64.b64decode(
+                    base64_data[start:start + IMAGE_DECODE_CHUNK_SIZE],
+                    validate=True
+                )
+                file.write(chunk)
+                if parser.image is None:
+                    self.feed_parser(parser, chunk)
+                    if parser.image is not None:
+                        self.check_image(parser.image)
+        except (binascii.Error, ValueError, OSError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        if parser.image is None:
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = self.get_extension(parser.image)
+        size = file.tell()
+        file.seek(0)
+        return UploadedFile(
+            file=file,
+            name=f'{uuid.uuid4()}.{extension}',
+            content_type=parser.image.get_format_mimetype(),
+            size=size
+        )
+
+    @staticmethod
+    def feed_parser(parser, chunk):
+        try:
+            parser.feed(chunk)
+        except Image.DecompressionBombError:
+            raise serializers.ValidationError(
+                'Сторона изображения не может быть больше '
+                f'{MAX_IMAGE_DIMENSION} пикселей'
+            )
+
+    @staticmethod
+    def get_extension(image):
+        extension = image.format.lower()
+        return 'jpeg' if extension == 'mpo' else extension
+
+    def check_image(self, image):
+        if self.get_extension(image) not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        if max(image.size) > MAX_IMAGE_DIMENSION:
+            raise serializers.ValidationError(
+                'Сторона изображения не может быть больше '
+                f'{MAX_IMAGE_DIMENSION} пикселей'
+            )
+
+
+def get_image_url(recipe, size, request):
+    name = recipe.renditions.get(size, {}).get(RENDITION_IMAGE_FORMAT)
+    if name is None:
+        if not recipe.image:
+            return None
+        name = recipe.image.name
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_image_srcset(recipe, request):
+    srcset = []
+    for rendition in recipe.renditions.values():
+        url = default_storage.url(rendition[SRCSET_IMAGE_FORMAT])
+        if request:
+            url = request.build_absolute_uri(url)
+        srcset.append(f'{url} {rendition["width"]}w')
+    return ', '.join(srcset)
+
+
+class RenditionImageField(serializers.Field):
+    """Ссылка на уменьшенную копию фото рецепта"""
+
+    def __init__(self, size, **kwargs):
+        self.size = size
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return get_image_url(recipe, self.size, self.context.get('request'))
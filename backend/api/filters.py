@@ -1,14 +1,13 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Tag, Recipe
+from api.constants import POPULAR_ORDERING, RECIPE_ORDERING_CHOICES
+from recipes.models import CountIngredientInRecipe, Tag, Recipe
+from recipes.search import search_recipes
 
 
-class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
 
 class RecipeFilter(FilterSet):
@@ -19,6 +18,19 @@ class RecipeFilter(FilterSet):
     )
     is_favorited = filters.BooleanFilter(method='filter_favorite')
     is_in_shopping_cart = filters.BooleanFilter(method='filter_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+    min_cooking_time = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='gte'
+    )
+    max_cooking_time = filters.NumberFilter(
+        field_name='cooking_time', lookup_expr='lte'
+    )
+    ingredients = NumberInFilter(method='filter_ingredients')
+    exclude_ingredients = NumberInFilter(method='filter_exclude_ingredients')
+    ordering = filters.ChoiceFilter(
+        choices=RECIPE_ORDERING_CHOICES,
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -33,3 +45,27 @@ class RecipeFilter(FilterSet):
         if value:
             return queryset.filter(shoppingcart__user_id=self.request.user.id)
         return queryset
+
+    def filter_ordering(self, queryset, name, value):
+        if value == POPULAR_ORDERING:
+            return queryset.order_by('-favorites_count', '-created')
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        for ingredient_id in set(value):
+            queryset = queryset.filter(Exists(
+                CountIngredientInRecipe.objects.filter(
+                    recipe=OuterRef('pk'), ingredient_id=ingredient_id
+                )
+            ))
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        return queryset.filter(~Exists(
+            CountIngredientInRecipe.objects.filter(
+                recipe=OuterRef('pk'), ingredient_id__in=value
+            )
+        ))
@@ -0,0 +1,77 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+from api.constants import METRICS_BUCKETS_MS
+
+_lock = Lock()
+_endpoints = {}
+
+
+class QueryTimer:
+    """Считает SQL-запросы и время их выполнения"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += perf_counter() - started
+            self.count += 1
+
+
+def record(endpoint, total, queries, sql, app, render):
+    with _lock:
+        stats = _endpoints.get(endpoint)
+        if stats is None:
+            stats = _endpoints[endpoint] = {
+                'requests': 0,
+                'total_ms': 0.0,
+                'sql_ms': 0.0,
+                'app_ms': 0.0,
+                'render_ms': 0.0,
+                'queries': 0,
+                'max_queries': 0,
+                'histogram': [0] * (len(METRICS_BUCKETS_MS) + 1),
+            }
+        stats['requests'] += 1
+        stats['total_ms'] += total
+        stats['sql_ms'] += sql
+        stats['app_ms'] += app
+        stats['render_ms'] += render
+        stats['queries'] += queries
+        stats['max_queries'] = max(stats['max_queries'], queries)
+        stats['histogram'][bisect_left(METRICS_BUCKETS_MS, total)] += 1
+
+
+def get_metrics():
+    with _lock:
+        endpoints = {
+            endpoint: dict(stats, histogram=list(stats['histogram']))
+            for endpoint, stats in _endpoints.items()
+        }
+    labels = [f'<={bucket}' for bucket in METRICS_BUCKETS_MS]
+    labels.append(f'>{METRICS_BUCKETS_MS[-1]}')
+    result = {}
+    for endpoint, stats in sorted(endpoints.items()):
+        requests = stats['requests']
+        result[endpoint] = {
+            'requests': requests,
+            'avg_ms': round(stats['total_ms'] / requests, 3),
+            'avg_sql_ms': round(stats['sql_ms'] / requests, 3),
+            'avg_app_ms': round(stats['app_ms'] / requests, 3),
+            'avg_render_ms': round(stats['render_ms'] / requests, 3),
+            'avg_queries': round(stats['queries'] / requests, 2),
+            'max_queries': stats['max_queries'],
+            'histogram_ms': dict(zip(labels, stats['histogram'])),
+        }
+    return result
+
+
+def reset_metrics():
+    with _lock:
+        _endpoints.clear()
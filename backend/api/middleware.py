@@ -0,0 +1,170 @@
+import logging
+import sys
+import warnings
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework.fields import Field
+
+from api.metrics import QueryTimer, record
+
+logger = logging.getLogger(__name__)
+
+NPLUSONE_ACTIONS = ('log', 'warn', 'raise')
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class NPlusOneWarning(UserWarning):
+    pass
+
+
+def find_serializer_field():
+    frame = sys._getframe(2)
+    while frame is not None:
+        field = frame.f_locals.get('self')
+        if isinstance(field, Field) and field.field_name:
+            return f'{type(field.parent).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+class QueryRepeatTracker:
+    """Находит структурно одинаковые SQL-запросы внутри одного запроса"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.fields = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[sql] += 1
+        if self.counts[sql] == self.threshold:
+            self.fields[sql] = find_serializer_field()
+        return execute(sql, params, many, context)
+
+    def repeats(self):
+        return [
+            (sql, self.counts[sql], field)
+            for sql, field in self.fields.items()
+        ]
+
+
+class RequestMetricsMiddleware:
+    """Замеряет SQL, время представления и рендеринга каждого запроса.
+
+    Результат отдаётся в заголовке Server-Timing и копится по эндпоинтам.
+    У потоковых ответов заголовок уходит до тела, поэтому в Server-Timing
+    попадает только работа представления, а в статистику по эндпоинтам -
+    полное время вместе с выдачей тела.
+    При REQUEST_METRICS_ENABLED = False мидлварь не подключается.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        request._metrics = {'render': 0.0}
+        started = perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        total, sql, app, render = self.get_timings(request, timer, started)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={sql:.2f};desc="{timer.count} queries"',
+            f'app;dur={app:.2f};desc="view and serializers"',
+            f'render;dur={render:.2f}',
+            f'total;dur={total:.2f}',
+        ))
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, request, timer, started
+            )
+        else:
+            self.record(request, timer, started)
+        return response
+
+    @staticmethod
+    def get_timings(request, timer, started):
+        total = (perf_counter() - started) * 1000
+        sql = timer.duration * 1000
+        render = request._metrics['render'] * 1000
+        return total, sql, max(total - sql - render, 0.0), render
+
+    def record(self, request, timer, started):
+        match = request.resolver_match
+        if match is None:
+            return
+        total, sql, app, render = self.get_timings(request, timer, started)
+        record(
+            f'{request.method} {match.view_name}',
+            total, timer.count, sql, app, render
+        )
+
+    def measure_stream(self, content, request, timer, started):
+        try:
+            with connection.execute_wrapper(timer):
+                yield from content
+        finally:
+            self.record(request, timer, started)
+
+    def process_template_response(self, request, response):
+        started = perf_counter()
+
+        def rendered(response):
+            request._metrics['render'] = perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class NPlusOneGuardMiddleware:
+    """Сообщает о повторяющихся запросах к базе во вьюхах api.
+
+    NPLUSONE_GUARD задаёт реакцию: log, warn или raise.
+    """
+
+    def __init__(self, get_response):
+        if settings.NPLUSONE_GUARD not in NPLUSONE_ACTIONS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tracker = QueryRepeatTracker(settings.NPLUSONE_THRESHOLD)
+        with connection.execute_wrapper(tracker):
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None or match.namespace != 'api':
+            return response
+        if response.streaming:
+            response.streaming_content = self.watch_stream(
+                response.streaming_content, request, tracker
+            )
+        else:
+            self.report(request, tracker)
+        return response
+
+    def watch_stream(self, content, request, tracker):
+        with connection.execute_wrapper(tracker):
+            yield from content
+        self.report(request, tracker)
+
+    def report(self, request, tracker):
+        for sql, count, field in tracker.repeats():
+            message = (
+                f'N+1 в {request.method} {request.path}: запрос выполнен '
+                f'{count} раз, поле сериализатора {field}: {sql}'
+            )
+            if settings.NPLUSONE_GUARD == 'raise':
+                raise NPlusOneError(message)
+            if settings.NPLUSONE_GUARD == 'warn':
+                warnings.warn(message, NPlusOneWarning)
+            else:
+                logger.warning(message)
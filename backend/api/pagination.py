@@ -1,8 +1,154 @@
-from rest_framework.pagination import PageNumberPagination
+from functools import partial
+from hashlib import md5
 
-from api.constants import PAGINATION
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from api.constants import (APPROXIMATE_COUNT_THRESHOLD, COUNT_CACHE_TIMEOUT,
+                           CURSOR_PAGINATION, ESTIMATE_CACHE_TIMEOUT,
+                           PAGINATION, PAGINATION_MODE_PARAM)
+
+
+def estimate_count(model):
+    """Оценка числа строк из статистики PostgreSQL.
+
+    Оценка кэшируется и для маленьких таблиц, чтобы страница не платила
+    лишним запросом перед точным COUNT(*).
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    key = f'estimate:{model._meta.db_table}'
+    count = cache.get(key)
+    if count is None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        count = int(row[0]) if row is not None else 0
+        cache.set(key, count, ESTIMATE_CACHE_TIMEOUT)
+    if count < APPROXIMATE_COUNT_THRESHOLD:
+        return None
+    return count
+
+
+class CountPaginator(Paginator):
+    """Пагинатор, получающий общее количество через count_source"""
+
+    def __init__(self, *args, count_source, **kwargs):
+        self.count_source = count_source
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        return self.count_source(self.object_list)
 
 
 class PagePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = PAGINATION
+
+
+class ApproximateCountPagination(PagePagination):
+    """Берёт количество из кэша или из статистики PostgreSQL"""
+
+    ignored_params = ('page', 'limit')
+    user_params = ('is_favorited', 'is_in_shopping_cart')
+
+    @property
+    def django_paginator_class(self):
+        return partial(CountPaginator, count_source=self.get_count)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count_is_approximate = False
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_count_cache_key(self, queryset):
+        params = sorted(
+            (key, value)
+            for key, values in self.request.query_params.lists()
+            if key not in self.ignored_params
+            for value in values
+        )
+        if any(key in self.user_params for key, _ in params):
+            params.append(('user', self.request.user.id))
+        key = f'{self.request.path}:{params}'
+        return 'count:' + md5(key.encode()).hexdigest()
+
+    def get_count(self, queryset):
+        if not queryset.query.where:
+            count = estimate_count(queryset.model)
+            if count is not None:
+                self.count_is_approximate = True
+                return count
+        key = self.get_count_cache_key(queryset)
+        count = cache.get(key)
+        if count is not None:
+            self.count_is_approximate = True
+            return count
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = self.count_is_approximate
+        return response
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = PAGINATION
+    ordering = ('-created', '-id')
+
+
+class TrendingCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = PAGINATION
+    ordering = ('-trending_score', '-id')
+
+
+class UserCursorPagination(CursorPagination):
+    page_size_query_param = 'limit'
+    page_size = PAGINATION
+    ordering = ('id',)
+
+
+class PaginationModeMixin:
+    """Включает курсорную пагинацию параметром ?pagination=cursor.
+
+    Курсор задаёт свою сортировку, поэтому параметры из
+    cursor_incompatible_params вместе с ним отклоняются.
+    """
+
+    cursor_pagination_class = None
+    cursor_incompatible_params = ()
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.cursor_pagination_class is not None
+            and self.request.query_params.get(
+                PAGINATION_MODE_PARAM
+            ) == CURSOR_PAGINATION
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
+
+    def paginate_queryset(self, queryset):
+        if isinstance(self.paginator, CursorPagination):
+            errors = {
+                param: 'Нельзя использовать с курсорной пагинацией'
+                for param in self.cursor_incompatible_params
+                if param in self.request.query_params
+            }
+            if errors:
+                raise ValidationError(errors)
+        return super().paginate_queryset(queryset)
@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
 
-from api.constants import MIN_INGR
+from api.constants import LIST_IMAGE_RENDITION
+from api.fields import (RecipeImageField, RenditionImageField,
+                        get_image_srcset, get_image_url)
+from recipes.cache import bump_recipe_ingredients_version
+from recipes.search import update_search_index
 from recipes.models import (CountIngredientInRecipe,
                             Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
@@ -27,7 +31,7 @@ class TagSerializers(serializers.ModelSerializer):
 
 
 class RecipeAndShoppingCartSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = RenditionImageField(LIST_IMAGE_RENDITION)
 
     class Meta:
         model = Recipe
@@ -67,7 +71,7 @@ class ShopingCartSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if not self.context.get('request').method == 'POST':
             return data
-        if Favorite.objects.filter(
+        if ShoppingCart.objects.filter(
             user=data['user'],
             recipe=data['recipe']
         ).exists():
@@ -93,6 +97,8 @@ class UserSerializer(serializers.ModelSerializer):
                   'username', 'email', 'password', 'is_subscribed')
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'subscribed'):
+            return obj.subscribed
         user = self.context['request'].user
         if user.is_anonymous or user is None:
             return False
@@ -139,13 +145,22 @@ class FollowSerializers(UserSerializer):
                             'recipes', 'recipes_count')
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
     def get_recipes(self, obj):
-        recipe_limit = int(self.context['request'].GET.get('recipes_limit', 0))
-        recipes = obj.recipes.all()
-        recipes = recipes[:recipe_limit] if recipe_limit else recipes
-        return ShortRecipeSerializer(recipes, many=True).data
+        if hasattr(obj, 'first_recipes'):
+            recipes = obj.first_recipes
+        else:
+            recipe_limit = int(
+                self.context['request'].GET.get('recipes_limit', 0)
+            )
+            recipes = obj.recipes.all()
+            recipes = recipes[:recipe_limit] if recipe_limit else recipes
+        return ShortRecipeSerializer(
+            recipes, many=True, context=self.context
+        ).data
 
 
 class CreateFollowSerializer(serializers.ModelSerializer):
@@ -189,7 +204,7 @@ class CountIngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class IngredientInRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     @staticmethod
@@ -211,7 +226,8 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 
 
 class RecipesSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     tags = TagSerializers(many=True)
     ingredients = CountIngredientInRecipeSerializer(
         many=True,
@@ -224,10 +240,22 @@ class RecipesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_srcset',
+                  'text', 'cooking_time')
+
+    def get_image(self, obj):
+        size = (
+            LIST_IMAGE_RENDITION
+            if isinstance(self.parent, serializers.ListSerializer) else None
+        )
+        return get_image_url(obj, size, self.context.get('request'))
+
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj, self.context.get('request'))
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous or user is None:
             return False
@@ -237,6 +265,8 @@ class RecipesSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous or user is None:
             return False
@@ -246,16 +276,23 @@ class RecipesSerializer(serializers.ModelSerializer):
         ).exists()
 
 
+class CookableRecipeSerializer(RecipesSerializer):
+    matched_ingredients = serializers.IntegerField(read_only=True)
+    missing_ingredients = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipesSerializer.Meta):
+        fields = RecipesSerializer.Meta.fields + (
+            'matched_ingredients', 'missing_ingredients'
+        )
+
+
 class CreateNewRecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientInRecipeSerializer(
         many=True,
         source='countingredientinrecipe'
     )
-    image = Base64ImageField()
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    image = RecipeImageField()
+    tags = serializers.ListField(child=serializers.IntegerField())
 
     class Meta:
         model = Recipe
@@ -263,13 +300,45 @@ class CreateNewRecipeSerializer(serializers.ModelSerializer):
                   'ingredients', 'cooking_time')
 
     def choice_ingredient(self, recipe, ingredients):
-        for ingredient in ingredients:
-            CountIngredientInRecipe.objects.create(
+        CountIngredientInRecipe.objects.bulk_create(
+            CountIngredientInRecipe(
                 recipe=recipe,
                 ingredient=ingredient['id'],
                 amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
+
+    def update_ingredients(self, recipe, ingredients):
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        to_delete, to_update = [], []
+        for row in CountIngredientInRecipe.objects.filter(recipe=recipe):
+            amount = amounts.pop(row.ingredient_id, None)
+            if amount is None:
+                to_delete.append(row.id)
+            elif amount != row.amount:
+                row.amount = amount
+                to_update.append(row)
+        if to_delete:
+            CountIngredientInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            CountIngredientInRecipe.objects.bulk_update(to_update, ('amount',))
+        if amounts:
+            CountIngredientInRecipe.objects.bulk_create(
+                CountIngredientInRecipe(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for ingredient_id, amount in amounts.items()
+            )
+        if to_delete or amounts:
+            transaction.on_commit(bump_recipe_ingredients_version)
 
+    @transaction.atomic
     def create(self, validated_data):
         image_data = validated_data.pop('image')
         tag = validated_data.pop('tags')
@@ -278,20 +347,16 @@ class CreateNewRecipeSerializer(serializers.ModelSerializer):
         recipe.tags.set(tag)
         self.choice_ingredient(ingredients=ingredients,
                                recipe=recipe)
+        transaction.on_commit(bump_recipe_ingredients_version)
+        update_search_index(Recipe.objects.filter(pk=recipe.pk))
         return recipe
 
-    def validate_ingredient(self, ingredients):
-        list_ingredients = []
-        for ingredient in ingredients:
-            if ingredient['id'] in list_ingredients:
-                raise serializers.ValidationError(
-                    'Ингредиент не может повторяться!'
-                )
-            if int(ingredient['amount']) <= MIN_INGR:
-                raise serializers.ValidationError(
-                    f'Количество ингредиента должно быть больше {MIN_INGR}'
-                )
-            list_ingredients.append(ingredient['id'])
+    def validate_ingredients(self, ingredients):
+        ids = {ingredient['id'] for ingredient in ingredients}
+        if len(ids) != len(ingredients):
+            raise serializers.ValidationError(
+                'Ингредиент не может повторяться!'
+            )
         return ingredients
 
     def validate_cooking_time(self, cooking_time):
@@ -309,30 +374,59 @@ class CreateNewRecipeSerializer(serializers.ModelSerializer):
         if not tags:
             raise serializers.ValidationError(
                 {'tags': 'Нужно выбрать тэг'})
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError(
-                    {'tags': 'Тэги должны быть уникальными'})
-            tags_list.append(tag)
+        if len(set(tags)) != len(tags):
+            raise serializers.ValidationError(
+                {'tags': 'Тэги должны быть уникальными'})
         return tags
 
+    def validate(self, data):
+        ingredients = data.get('countingredientinrecipe', [])
+        tags = data.get('tags', [])
+        found_ingredients = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in ingredients}
+        )
+        found_tags = Tag.objects.in_bulk(set(tags))
+        errors = {}
+        missing_ingredients = [
+            str(ingredient['id']) for ingredient in ingredients
+            if ingredient['id'] not in found_ingredients
+        ]
+        if missing_ingredients:
+            errors['ingredients'] = (
+                'Ингредиенты не найдены: ' + ', '.join(missing_ingredients)
+            )
+        missing_tags = [str(tag) for tag in tags if tag not in found_tags]
+        if missing_tags:
+            errors['tags'] = 'Тэги не найдены: ' + ', '.join(missing_tags)
+        if errors:
+            raise serializers.ValidationError(errors)
+        for ingredient in ingredients:
+            ingredient['id'] = found_ingredients[ingredient['id']]
+        if 'tags' in data:
+            data['tags'] = [found_tags[tag] for tag in tags]
+        return data
+
     def to_representation(self, instance):
         return RecipesSerializer(
-            instance, context=self.context).data
+            Recipe.objects.for_read(
+                self.context['request'].user
+            ).get(pk=instance.pk),
+            context=self.context
+        ).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('countingredientinrecipe')
-        instance.tags.clear()
-        instance.ingredients.clear()
         instance.tags.set(tags)
-        self.choice_ingredient(ingredients=ingredients, recipe=instance)
-        return super().update(instance, validated_data)
+        self.update_ingredients(instance, ingredients)
+        recipe = super().update(instance, validated_data)
+        update_search_index(Recipe.objects.filter(pk=recipe.pk))
+        return recipe
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
-    image = Base64ImageField()
+    image = RenditionImageField(LIST_IMAGE_RENDITION)
 
     class Meta:
         model = Recipe
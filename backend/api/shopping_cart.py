@@ -0,0 +1,122 @@
+import csv
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+from api.constants import (PDF_CHUNK_SIZE, PDF_FONT_NAME, PDF_FONT_SIZE,
+                           PDF_LEADING, PDF_MARGIN,
+                           SHOPPING_CART_CACHE_MAX_SIZE,
+                           SHOPPING_CART_CACHE_TIMEOUT,
+                           SHOPPING_CART_CHUNK_SIZE)
+from recipes.models import CountIngredientInRecipe
+
+
+class Echo:
+    """Буфер для csv.writer, возвращающий записанную строку"""
+
+    def write(self, value):
+        return value
+
+
+def get_ingredients(user):
+    return CountIngredientInRecipe.objects.filter(
+        recipe__shoppingcart__user=user
+    ).values(
+        'ingredient__name',
+        'ingredient__measurement_unit'
+    ).annotate(
+        amount=Sum('amount')
+    ).order_by('ingredient__name').iterator(
+        chunk_size=SHOPPING_CART_CHUNK_SIZE
+    )
+
+
+def render_txt(ingredients):
+    yield 'Список покупок:\n'
+    for ingredient in ingredients:
+        yield (
+            f'{ingredient["ingredient__name"]} '
+            f'{ingredient["amount"]}'
+            f'{ingredient["ingredient__measurement_unit"]}\n'
+        )
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единицы измерения'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['amount'],
+            ingredient['ingredient__measurement_unit']
+        ))
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font():
+    path = settings.SHOPPING_CART_PDF_FONT
+    try:
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, path))
+    except (OSError, TTFError):
+        raise ImproperlyConfigured(f'Не найден шрифт для PDF: {path}')
+
+
+def write_pdf(ingredients):
+    """Рисует список постранично; в файл попадают только нужные глифы"""
+    buffer = BytesIO()
+    pdf = Canvas(buffer, pagesize=A4)
+    width, height = A4
+    top = height - PDF_MARGIN - PDF_FONT_SIZE
+    text = pdf.beginText(PDF_MARGIN, top)
+    text.setFont(PDF_FONT_NAME, PDF_FONT_SIZE, PDF_LEADING)
+    for line in render_txt(ingredients):
+        for part in simpleSplit(
+            line.rstrip('\n'), PDF_FONT_NAME, PDF_FONT_SIZE,
+            width - 2 * PDF_MARGIN
+        ):
+            if text.getY() < PDF_MARGIN:
+                pdf.drawText(text)
+                pdf.showPage()
+                text = pdf.beginText(PDF_MARGIN, top)
+                text.setFont(PDF_FONT_NAME, PDF_FONT_SIZE, PDF_LEADING)
+            text.textLine(part)
+    pdf.drawText(text)
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+def render_pdf(ingredients):
+    register_pdf_font()
+    return write_pdf(ingredients)
+
+
+def cache_rendered(chunks, key):
+    """Отдаёт части файла и кэширует его целиком, если он небольшой"""
+    parts, size = [], 0
+    for chunk in chunks:
+        if parts is not None:
+            size += len(chunk)
+            if size > SHOPPING_CART_CACHE_MAX_SIZE:
+                parts = None
+            else:
+                parts.append(chunk)
+        yield chunk
+    if parts:
+        cache.set(key, parts[0][:0].join(parts), SHOPPING_CART_CACHE_TIMEOUT)
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'pdf': ('application/pdf', render_pdf),
+}
@@ -0,0 +1,55 @@
+import base64
+import struct
+import zlib
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from api.constants import MAX_IMAGE_DIMENSION
+from api.fields import RecipeImageField
+
+
+def png_chunk(kind, data):
+    return (
+        struct.pack('>I', len(data)) + kind + data
+        + struct.pack('>I', zlib.crc32(kind + data))
+    )
+
+
+def png_header(width, height):
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + png_chunk(
+            b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+        )
+        + png_chunk(b'IDAT', zlib.compress(b'\x00' * 16))
+    )
+
+
+def to_base64(content):
+    return 'data:image/png;base64,' + base64.b64encode(content).decode()
+
+
+class RecipeImageFieldTests(SimpleTestCase):
+
+    def test_small_image_is_accepted(self):
+        image = RecipeImageField().to_internal_value(
+            to_base64(png_header(10, 10))
+        )
+        self.assertTrue(image.name.endswith('.png'))
+
+    def test_large_dimension_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            RecipeImageField().to_internal_value(
+                to_base64(png_header(MAX_IMAGE_DIMENSION + 1, 10))
+            )
+
+    def test_decompression_bomb_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            RecipeImageField().to_internal_value(
+                to_base64(png_header(20000, 20000))
+            )
+
+    def test_invalid_base64_is_rejected(self):
+        with self.assertRaises(serializers.ValidationError):
+            RecipeImageField().to_internal_value('data:image/png;base64,!!')
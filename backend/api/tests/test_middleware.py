@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.metrics import get_metrics, reset_metrics
+from api.middleware import NPlusOneError
+from recipes.cache import get_shopping_cart_version
+from recipes.models import Ingredient, Recipe, ShoppingCart
+from users.models import User
+
+MIDDLEWARE = (
+    'django.middleware.common.CommonMiddleware',
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.NPlusOneGuardMiddleware',
+)
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/?file_format=csv'
+
+
+@override_settings(
+    MIDDLEWARE=MIDDLEWARE,
+    REQUEST_METRICS_ENABLED=True,
+    NPLUSONE_GUARD='raise',
+    NPLUSONE_THRESHOLD=3,
+)
+class StreamingMiddlewareTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=cls.user
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(name='Соль', measurement_unit='г'),
+            through_defaults={'amount': 5}
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        reset_metrics()
+        get_shopping_cart_version(self.user.id)
+        self.client.force_authenticate(self.user)
+
+    def test_streamed_body_queries_are_recorded(self):
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertTrue(response.streaming)
+        self.assertIn('Server-Timing', response)
+        self.assertEqual(get_metrics(), {})
+        b''.join(response.streaming_content)
+        [stats] = get_metrics().values()
+        self.assertEqual(stats['requests'], 1)
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+        self.assertEqual(stats['max_queries'], 2)
+
+    def test_streamed_body_is_checked_for_repeats(self):
+        def get_ingredients(user):
+            for _ in range(3):
+                list(ShoppingCart.objects.filter(user=user))
+            yield from ()
+
+        with patch('api.views.get_ingredients', get_ingredients):
+            response = self.client.get(DOWNLOAD_URL)
+            with self.assertRaises(NPlusOneError):
+                b''.join(response.streaming_content)
@@ -0,0 +1,57 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APITestCase
+
+from api.pagination import estimate_count
+from recipes.models import Recipe
+from users.models import User
+
+RECIPES_URL = '/api/recipes/'
+
+
+class CursorPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=cls.user
+        )
+
+    def test_cursor_list(self):
+        response = self.client.get(RECIPES_URL, {'pagination': 'cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_cursor_rejects_custom_ordering(self):
+        for params in ({'ordering': 'popular'}, {'search': 'рецепт'}):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    RECIPES_URL, {'pagination': 'cursor', **params}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(set(response.data), set(params))
+
+    def test_page_pagination_keeps_custom_ordering(self):
+        response = self.client.get(RECIPES_URL, {'ordering': 'popular'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Оценка есть только в PostgreSQL'
+)
+class EstimateCountTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_small_table_estimate_is_cached(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(estimate_count(Recipe))
+        with self.assertNumQueries(0):
+            self.assertIsNone(estimate_count(Recipe))
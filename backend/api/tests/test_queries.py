@@ -0,0 +1,164 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from recipes.models import (CountIngredientInRecipe, Favorite, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from users.models import Follow, User
+
+AUTHORS = 12
+RECIPES_PER_AUTHOR = 10
+# На PostgreSQL нефильтрованный список сначала читает оценку из pg_class
+ESTIMATE_QUERIES = int(connection.vendor == 'postgresql')
+
+
+@override_settings(NPLUSONE_GUARD='raise')
+class QueryCountTests(APITestCase):
+    """Число запросов к базе не зависит от размера страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags = Tag.objects.bulk_create(
+            Tag(name=f'Тэг {number}', slug=f'tag{number}',
+                color=f'#FF000{number}')
+            for number in range(3)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        authors = User.objects.bulk_create(
+            User(username=f'author{number}',
+                 email=f'author{number}@example.com')
+            for number in range(AUTHORS)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(name=f'Рецепт {number}', text='Описание',
+                   cooking_time=10, author=author)
+            for number, author in enumerate(
+                author for author in authors
+                for _ in range(RECIPES_PER_AUTHOR)
+            )
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+            for recipe in recipes for tag in tags[:2]
+        )
+        CountIngredientInRecipe.objects.bulk_create(
+            CountIngredientInRecipe(
+                recipe=recipe, ingredient=ingredient, amount=10
+            )
+            for recipe in recipes for ingredient in ingredients[:3]
+        )
+        cls.reader = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        cls.casual_reader = User.objects.create(
+            username='casual', email='casual@example.com'
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.reader, recipe=recipe)
+            for recipe in recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.reader, recipe=recipe)
+            for recipe in recipes[::3]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.casual_reader, author=author)
+            for author in authors[:2]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, user=None, queries=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if queries is not None:
+            self.assertEqual(len(context.captured_queries), queries)
+        return response.json(), len(context.captured_queries)
+
+    def assertSameQueries(self, urls, user=None):
+        _, queries = self.get(urls[0], user)
+        for url in urls[1:]:
+            cache.clear()
+            self.get(url, user, queries)
+        return queries
+
+    def test_recipe_list_anonymous(self):
+        with self.assertNumQueries(4 + ESTIMATE_QUERIES):
+            self.client.get('/api/recipes/?limit=6')
+        cache.clear()
+        with self.assertNumQueries(4 + ESTIMATE_QUERIES):
+            response = self.client.get('/api/recipes/?limit=100')
+        self.assertEqual(len(response.json()['results']), 100)
+
+    def test_recipe_list_authenticated(self):
+        self.client.force_authenticate(self.reader)
+        with self.assertNumQueries(5 + ESTIMATE_QUERIES):
+            self.client.get('/api/recipes/?limit=6')
+        cache.clear()
+        with self.assertNumQueries(5 + ESTIMATE_QUERIES):
+            response = self.client.get('/api/recipes/?limit=100')
+        results = response.json()['results']
+        self.assertEqual(len(results), 100)
+        favorited = set(Favorite.objects.filter(
+            user=self.reader
+        ).values_list('recipe_id', flat=True))
+        in_cart = set(ShoppingCart.objects.filter(
+            user=self.reader
+        ).values_list('recipe_id', flat=True))
+        for recipe in results:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorited)
+            self.assertEqual(
+                recipe['is_in_shopping_cart'], recipe['id'] in in_cart
+            )
+            self.assertTrue(recipe['author']['is_subscribed'])
+
+    def test_recipe_detail(self):
+        recipe = Recipe.objects.first()
+        self.client.force_authenticate(self.reader)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(len(response.json()['ingredients']), 3)
+
+    def test_subscriptions(self):
+        self.assertSameQueries([
+            '/api/users/subscriptions/?limit=2&recipes_limit=1',
+            '/api/users/subscriptions/?limit=12&recipes_limit=10',
+        ], self.reader)
+        data, _ = self.get(
+            '/api/users/subscriptions/?limit=12&recipes_limit=3',
+            self.reader, 3
+        )
+        self.assertEqual(len(data['results']), AUTHORS)
+        for author in data['results']:
+            self.assertTrue(author['is_subscribed'])
+            self.assertEqual(author['recipes_count'], RECIPES_PER_AUTHOR)
+            self.assertEqual(len(author['recipes']), 3)
+
+    def test_feed(self):
+        queries = self.assertSameQueries(
+            ['/api/recipes/feed/?limit=6', '/api/recipes/feed/?limit=100'],
+            self.reader
+        )
+        data, _ = self.get(
+            '/api/recipes/feed/?limit=6', self.casual_reader, queries
+        )
+        seen = []
+        while True:
+            seen.extend(recipe['id'] for recipe in data['results'])
+            if data['next'] is None:
+                break
+            data, _ = self.get(data['next'], self.casual_reader, queries)
+        self.assertEqual(seen, list(Recipe.objects.filter(
+            author__follow__user=self.casual_reader
+        ).order_by('-created', '-id').values_list('id', flat=True)))
@@ -0,0 +1,58 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.models import Recipe
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def image_file(name, color):
+    buffer = BytesIO()
+    Image.new('RGB', (600, 400), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_BACKEND='sync')
+class RecipeRenditionsTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe = Recipe.objects.create(
+                name='Рецепт', text='Описание', cooking_time=10,
+                author=author, image=image_file('first.png', 'red')
+            )
+        self.recipe.refresh_from_db()
+
+    def test_renditions_built_on_create(self):
+        self.assertIn('card', self.recipe.renditions)
+
+    def test_new_image_rebuilds_renditions(self):
+        old_card = self.recipe.renditions['card']['jpeg']
+        self.recipe.image = image_file('second.png', 'blue')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertNotEqual(self.recipe.renditions['card']['jpeg'], old_card)
+
+    def test_save_without_new_image_keeps_renditions(self):
+        renditions = self.recipe.renditions
+        self.recipe.name = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.recipe.save()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.renditions, renditions)
+        self.assertEqual(callbacks, [])
@@ -0,0 +1,98 @@
+import os
+import re
+from time import time
+from unittest import skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+from users.models import User
+
+DOWNLOAD_URL = '/api/recipes/download_shopping_cart/?file_format=pdf'
+TXT_URL = '/api/recipes/download_shopping_cart/?file_format=txt'
+
+
+class ShoppingCartConditionalTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=cls.user
+        )
+        cls.recipe.ingredients.add(
+            Ingredient.objects.create(name='Соль', measurement_unit='г'),
+            through_defaults={'amount': 5}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_etag_is_the_only_validator(self):
+        response = self.client.get(TXT_URL)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(TXT_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        response = self.client.get(
+            TXT_URL, HTTP_IF_NONE_MATCH=etag,
+            HTTP_IF_MODIFIED_SINCE=http_date(time() + 60)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Соль 5г', b''.join(response.streaming_content).decode())
+
+
+@skipUnless(
+    os.path.exists(settings.SHOPPING_CART_PDF_FONT),
+    'Нет шрифта для PDF'
+)
+class ShoppingCartPdfTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='user', email='user@example.com'
+        )
+        recipe = Recipe.objects.create(
+            name='Рецепт', text='Описание', cooking_time=10, author=cls.user
+        )
+        for index in range(100):
+            recipe.ingredients.add(
+                Ingredient.objects.create(
+                    name=f'Ингредиент {index}', measurement_unit='г'
+                ),
+                through_defaults={'amount': index + 1}
+            )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_pdf_has_a_page_per_screenful_of_lines(self):
+        response = self.client.get(DOWNLOAD_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        body = b''.join(response.streaming_content)
+        self.assertTrue(body.startswith(b'%PDF-'))
+        self.assertTrue(body.endswith(b'%%EOF\n'))
+        xref = int(re.search(rb'startxref\n(\d+)\n', body).group(1))
+        self.assertTrue(body[xref:].startswith(b'xref\n'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', body)), 3)
+
+    def test_pdf_embeds_only_used_glyphs(self):
+        response = self.client.get(DOWNLOAD_URL)
+        body = b''.join(response.streaming_content)
+        with open(settings.SHOPPING_CART_PDF_FONT, 'rb') as font:
+            self.assertLess(len(body), len(font.read()) // 10)
@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientViewSet, TagViewSet, RecipeViewSet, UserViewSet
+from api.views import (IngredientViewSet, TagViewSet, RecipeViewSet,
+                       RequestMetricsView, UserViewSet)
 
 
 app_name = 'api'
@@ -14,6 +15,7 @@ router.register('users', UserViewSet, basename='user')
 
 
 urlpatterns = [
+    path('metrics/', RequestMetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken'))
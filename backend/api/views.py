@@ -1,28 +1,45 @@
+from hashlib import md5
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Count, Exists, F, OuterRef, Value
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import viewsets, status
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import PagePagination
+from api.constants import (AUTOCOMPLETE_LIMIT, MAX_AUTOCOMPLETE_LIMIT,
+                           MAX_COOKABLE_INGREDIENTS,
+                           SHOPPING_CART_DEFAULT_FORMAT, TAGS_MAX_AGE)
+from api.filters import RecipeFilter
+from api.metrics import get_metrics, reset_metrics
+from api.pagination import (ApproximateCountPagination, PagePagination,
+                            PaginationModeMixin, RecipeCursorPagination,
+                            TrendingCursorPagination, UserCursorPagination)
 from api.permissions import IsAuthUserOrAuthorOrReadOnly
 from api.serializers import (IngredientSerializers,
                              TagSerializers,
                              RecipesSerializer,
+                             CookableRecipeSerializer,
                              FollowSerializers,
                              CreateNewRecipeSerializer,
                              FavoriteSerializer,
                              ShopingCartSerializer,
                              CreateFollowSerializer)
-from recipes.models import (CountIngredientInRecipe,
-                            Favorite, Ingredient, Recipe,
+from api.shopping_cart import FORMATS, cache_rendered, get_ingredients
+from recipes.models import (Favorite, Ingredient, Recipe,
                             ShoppingCart, Tag)
+from recipes.cache import (get_ingredient_snapshot,
+                           get_recipe_ingredient_index,
+                           get_shopping_cart_version, get_tags_payload_key)
 from users.models import Follow
 
 User = get_user_model()
@@ -31,29 +48,80 @@ User = get_user_model()
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializers
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        snapshot = get_ingredient_snapshot()
+        name = request.query_params.get('name')
+        if name:
+            return Response(snapshot.startswith(name))
+        return Response(snapshot.ingredients)
+
+    @action(methods=('get',), detail=False)
+    def autocomplete(self, request):
+        try:
+            limit = min(
+                int(request.query_params.get('limit', AUTOCOMPLETE_LIMIT)),
+                MAX_AUTOCOMPLETE_LIMIT
+            )
+        except ValueError:
+            limit = AUTOCOMPLETE_LIMIT
+        name = request.query_params.get('name', '').strip()
+        if not name:
+            return Response([])
+        return Response(get_ingredient_snapshot().autocomplete(name, limit))
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializers
 
+    def list(self, request, *args, **kwargs):
+        payload_key = get_tags_payload_key()
+        payload = cache.get(payload_key)
+        if payload is None:
+            content = JSONRenderer().render(
+                self.get_serializer(self.get_queryset(), many=True).data
+            )
+            payload = (content, f'"{md5(content).hexdigest()}"')
+            cache.set(payload_key, payload, None)
+        content, etag = payload
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=TAGS_MAX_AGE)
+        return response
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(PaginationModeMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = PagePagination
+    pagination_class = ApproximateCountPagination
+    cursor_pagination_class = RecipeCursorPagination
+    cursor_incompatible_params = ('ordering', 'search')
     permission_classes = [IsAuthUserOrAuthorOrReadOnly]
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in (
+            'retrieve', 'list', 'trending', 'feed', 'cookable'
+        ):
+            return Recipe.objects.for_read(self.request.user)
+        return Recipe.objects.with_user_flags(self.request.user)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def delete_recipe(self, model, user, recipe_id):
-        obj = model.objects.filter(user=user, recipe_id=recipe_id)
-        if obj.exists():
-            obj.delete()
+    def delete_recipe(self, model, user, recipe_id, counter_field):
+        with transaction.atomic():
+            deleted, _ = model.objects.filter(
+                user=user, recipe_id=recipe_id
+            ).delete()
+            if deleted:
+                Recipe.objects.change_counter(
+                    recipe_id, counter_field, -deleted
+                )
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             {'errors': 'Невозможно удалить рецепт'},
@@ -74,13 +142,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
         }
         serializer = FavoriteSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            Recipe.objects.change_counter(recipe.id, 'favorites_count', 1)
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
-        return self.delete_recipe(Favorite, request.user, pk)
+        return self.delete_recipe(
+            Favorite, request.user, pk, 'favorites_count'
+        )
 
     @action(
         methods=['POST'],
@@ -96,24 +168,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
         }
         serializer = ShopingCartSerializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            Recipe.objects.change_counter(
+                recipe.id, 'shopping_cart_count', 1
+            )
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
-        return self.delete_recipe(ShoppingCart, request.user, pk)
-
-    @staticmethod
-    def shopping_cart_txt(ingredients):
-        shopping_cart = 'Список покупок:\n'
-        shopping_cart += ''.join([
-            f'{ingredient["ingredient__name"]} '
-            f'{ingredient["amount"]}'
-            f'{ingredient["ingredient__measurement_unit"]}\n'
-            for ingredient in ingredients
-        ])
-        return shopping_cart
+        return self.delete_recipe(
+            ShoppingCart, request.user, pk, 'shopping_cart_count'
+        )
+
+    @action(
+        methods=('get',),
+        detail=False,
+        cursor_pagination_class=TrendingCursorPagination,
+    )
+    def trending(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            score__isnull=False
+        ).annotate(trending_score=F('score__score')).order_by(
+            '-trending_score', '-id'
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('get',),
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=RecipeCursorPagination,
+    )
+    def feed(self, request):
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            author__follow__user=request.user
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('get',),
+        detail=False,
+        pagination_class=PagePagination,
+        cursor_pagination_class=None,
+    )
+    def cookable(self, request):
+        try:
+            ingredient_ids = {
+                int(ingredient_id) for ingredient_id
+                in request.query_params.get('ingredients', '').split(',')
+                if ingredient_id.strip()
+            }
+        except ValueError:
+            ingredient_ids = None
+        if not ingredient_ids or (
+            len(ingredient_ids) > MAX_COOKABLE_INGREDIENTS
+        ):
+            return Response(
+                {'errors': 'Передайте от 1 до '
+                           f'{MAX_COOKABLE_INGREDIENTS} id ингредиентов '
+                           'через запятую'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        page = self.paginate_queryset(
+            get_recipe_ingredient_index().rank(ingredient_ids)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, matched, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched_ingredients = matched
+                recipe.missing_ingredients = missing
+                results.append(recipe)
+        serializer = self.get_serializer(results, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         methods=('get',),
@@ -121,27 +257,56 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated],
     )
     def download_shopping_cart(self, request):
-        ingredients = CountIngredientInRecipe.objects.filter(
-            recipe__shoppingcart__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        shopping_cart = self.shopping_cart_txt(ingredients)
-        response = HttpResponse(shopping_cart, content_type='text/plan')
-        response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt')
+        file_format = request.query_params.get(
+            'file_format', SHOPPING_CART_DEFAULT_FORMAT
+        )
+        if file_format not in FORMATS:
+            return Response(
+                {'errors': 'Доступные форматы: ' + ', '.join(FORMATS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        version = get_shopping_cart_version(request.user.id)
+        etag = f'"{version:.6f}-{file_format}"'
+        response = get_conditional_response(request, etag=etag)
+        content_type, render = FORMATS[file_format]
+        cache_key = f'shopping_cart:{request.user.id}:{file_format}:{etag}'
+        if response is None:
+            shopping_cart = cache.get(cache_key)
+            if shopping_cart is not None:
+                response = HttpResponse(
+                    shopping_cart, content_type=content_type
+                )
+            else:
+                response = StreamingHttpResponse(cache_rendered(
+                    render(get_ingredients(request.user)), cache_key
+                ), content_type=content_type)
+            response['Content-Disposition'] = (
+                f'attachment; filename="shopping_cart.{file_format}"')
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
     def get_serializer_class(self):
-        if self.action in ('retrieve', 'list'):
+        if self.action == 'cookable':
+            return CookableRecipeSerializer
+        if self.action in ('retrieve', 'list', 'trending', 'feed'):
             return RecipesSerializer
         return CreateNewRecipeSerializer
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(PaginationModeMixin, DjoserUserViewSet):
     queryset = User.objects.all()
     pagination_class = PagePagination
+    cursor_pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action in ('list', 'retrieve') and user.is_authenticated:
+            queryset = queryset.annotate(subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        return queryset.order_by('id')
 
     @action(
         detail=True,
@@ -181,11 +346,31 @@ class UserViewSet(DjoserUserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(follow__user=request.user)
+        queryset = User.objects.filter(follow__user=request.user).annotate(
+            recipes_count=Count('recipes'),
+            subscribed=Value(True)
+        ).order_by('id')
         pages = self.paginate_queryset(queryset)
+        recipes = Recipe.objects.first_by_author(
+            [author.id for author in pages],
+            int(request.GET.get('recipes_limit', 0))
+        )
+        for author in pages:
+            author.first_recipes = recipes[author.id]
         serializer = FollowSerializers(
             pages,
             many=True,
             context={'request': request}
         )
         return self.get_paginated_response(serializer.data)
+
+
+class RequestMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_metrics())
+
+    def delete(self, request):
+        reset_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,154 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from time import time
+
+from django.db import transaction
+
+from recipes.constants import (MIN_LENGTH_SUBSTRING_SEARCH,
+                               RECIPE_INDEX_CHUNK_SIZE)
+from recipes.models import CacheVersion, CountIngredientInRecipe, Ingredient
+
+SHOPPING_CART_VERSION_KEY = 'shopping_cart:{}:version'
+INGREDIENTS_VERSION_KEY = 'ingredients:version'
+RECIPE_INGREDIENTS_VERSION_KEY = 'recipe_ingredients:version'
+TAGS_VERSION_KEY = 'tags:version'
+TAGS_PAYLOAD_KEY = 'tags:payload:{}'
+
+_ingredient_snapshot = (None, None)
+_recipe_ingredient_index = (None, None)
+
+
+def get_version(key):
+    """Версия данных из базы, общая для всех процессов"""
+    version = CacheVersion.objects.filter(key=key).values_list(
+        'version', flat=True
+    ).first()
+    if version is None:
+        version = CacheVersion.objects.get_or_create(
+            key=key, defaults={'version': time()}
+        )[0].version
+    return version
+
+
+def bump_versions(keys):
+    version = time()
+    with transaction.atomic():
+        CacheVersion.objects.filter(key__in=keys).update(version=version)
+        CacheVersion.objects.bulk_create(
+            (CacheVersion(key=key, version=version) for key in keys),
+            ignore_conflicts=True
+        )
+
+
+def get_shopping_cart_version(user_id):
+    return get_version(SHOPPING_CART_VERSION_KEY.format(user_id))
+
+
+def bump_shopping_cart_version(user_ids):
+    bump_versions([
+        SHOPPING_CART_VERSION_KEY.format(user_id) for user_id in user_ids
+    ])
+
+
+def bump_ingredients_version():
+    bump_versions([INGREDIENTS_VERSION_KEY])
+
+
+def bump_recipe_ingredients_version():
+    bump_versions([RECIPE_INGREDIENTS_VERSION_KEY])
+
+
+def get_tags_payload_key():
+    return TAGS_PAYLOAD_KEY.format(get_version(TAGS_VERSION_KEY))
+
+
+def invalidate_tags_payload():
+    bump_versions([TAGS_VERSION_KEY])
+
+
+class IngredientSnapshot:
+    """Отсортированный по названию список ингредиентов в памяти процесса"""
+
+    def __init__(self, ingredients):
+        self.ingredients = sorted(
+            ingredients, key=lambda ingredient: ingredient['name'].lower()
+        )
+        self.names = [
+            ingredient['name'].lower() for ingredient in self.ingredients
+        ]
+
+    def _prefix_range(self, name):
+        start = end = bisect_left(self.names, name)
+        while end < len(self.names) and self.names[end].startswith(name):
+            end += 1
+        return start, end
+
+    def startswith(self, name):
+        start, end = self._prefix_range(name.lower())
+        return self.ingredients[start:end]
+
+    def autocomplete(self, name, limit):
+        name = name.lower()
+        start, end = self._prefix_range(name)
+        result = self.ingredients[start:min(end, start + limit)]
+        if len(name) < MIN_LENGTH_SUBSTRING_SEARCH:
+            return result
+        for index, lower_name in enumerate(self.names):
+            if len(result) >= limit:
+                break
+            if not start <= index < end and name in lower_name:
+                result.append(self.ingredients[index])
+        return result
+
+
+def get_ingredient_snapshot():
+    global _ingredient_snapshot
+    version = get_version(INGREDIENTS_VERSION_KEY)
+    snapshot_version, snapshot = _ingredient_snapshot
+    if snapshot is None or snapshot_version != version:
+        snapshot = IngredientSnapshot(
+            Ingredient.objects.values('id', 'name', 'measurement_unit')
+        )
+        _ingredient_snapshot = (version, snapshot)
+    return snapshot
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс от ингредиента к рецептам в памяти процесса"""
+
+    def __init__(self, rows):
+        self.recipes = defaultdict(list)
+        self.sizes = Counter()
+        for recipe_id, ingredient_id in rows:
+            self.recipes[ingredient_id].append(recipe_id)
+            self.sizes[recipe_id] += 1
+
+    def rank(self, ingredient_ids):
+        """Рецепты хотя бы с одним ингредиентом из списка.
+
+        Сначала идут рецепты, которым не хватает меньше ингредиентов,
+        при равенстве - с большим числом совпадений.
+        """
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(self.recipes.get(ingredient_id, ()))
+        ranked = [
+            (recipe_id, count, self.sizes[recipe_id] - count)
+            for recipe_id, count in matched.items()
+        ]
+        ranked.sort(key=lambda row: (row[2], -row[1], -row[0]))
+        return ranked
+
+
+def get_recipe_ingredient_index():
+    global _recipe_ingredient_index
+    version = get_version(RECIPE_INGREDIENTS_VERSION_KEY)
+    index_version, index = _recipe_ingredient_index
+    if index is None or index_version != version:
+        index = RecipeIngredientIndex(
+            CountIngredientInRecipe.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ).order_by().iterator(chunk_size=RECIPE_INDEX_CHUNK_SIZE)
+        )
+        _recipe_ingredient_index = (version, index)
+    return index
@@ -6,3 +6,23 @@ MIN_VALUE_TIME = 1
 MAX_VALUE_TIME = 1440
 MIN_VALUE_AMOUNT = 1
 MAX_VALUE_AMOUNT = 1000
+MIN_LENGTH_SUBSTRING_SEARCH = 3
+IMAGE_RENDITIONS = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1280,
+}
+IMAGE_RENDITION_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+IMAGE_RENDITION_QUALITY = 80
+COUNTERS_BATCH_SIZE = 1000
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+TRENDING_MIN_SCORE = 0.01
+TRENDING_BATCH_SIZE = 1000
+SEARCH_CONFIG = 'russian'
+SEARCH_INDEX_BATCH_SIZE = 1000
+RECIPE_INDEX_CHUNK_SIZE = 5000
@@ -0,0 +1,93 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from recipes.constants import (IMAGE_RENDITION_FORMATS,
+                               IMAGE_RENDITION_QUALITY, IMAGE_RENDITIONS)
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_rendition_name(image_name, size, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'recipes/renditions/{stem}/{size}.{extension}'
+
+
+def open_image(file):
+    image = ImageOps.exif_transpose(Image.open(file))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def build_renditions(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as file:
+        image = open_image(file)
+    renditions = {}
+    for size, max_side in IMAGE_RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail((max_side, max_side), Image.LANCZOS)
+        renditions[size] = {
+            'width': rendition.width,
+            'height': rendition.height,
+        }
+        for extension, image_format in IMAGE_RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            rendition.save(
+                buffer, image_format, quality=IMAGE_RENDITION_QUALITY
+            )
+            name = get_rendition_name(recipe.image.name, size, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            renditions[size][extension] = default_storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+    Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        renditions=renditions
+    )
+
+
+def run_task(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception('Ошибка обработки изображения %s', args)
+    finally:
+        connections.close_all()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-processing'
+        )
+    return _executor
+
+
+def submit(task, *args):
+    if settings.IMAGE_PROCESSING_BACKEND == 'sync':
+        task(*args)
+    else:
+        get_executor().submit(run_task, task, *args)
+
+
+def schedule_renditions(recipe):
+    transaction.on_commit(lambda: submit(build_renditions, recipe.id))
@@ -0,0 +1,290 @@
+import base64
+import json
+import os
+from io import BytesIO, StringIO
+from statistics import mean
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import Follow, User
+
+DEFAULT_BASELINE = os.path.join(
+    settings.BASE_DIR, 'benchmarks', 'baseline.json'
+)
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * rank // 100)]
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), 'orange').save(buffer, 'JPEG')
+    return (
+        'data:image/jpeg;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт тестовую базу, заполняет её сгенерированными данными и '
+        'замеряет задержки и число запросов основных эндпоинтов API'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Сохранить результаты как новую базовую линию'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help='Допустимый рост p50 относительно базовой линии'
+        )
+        parser.add_argument(
+            '--tolerance-ms', type=float, default=5.0,
+            help='Допустимый рост p50 в миллисекундах сверх --tolerance'
+        )
+        parser.add_argument('--keepdb', action='store_true')
+        parser.add_argument(
+            '--feed-follows', default='10,100,1000,10000',
+            help='Числа подписок читателей ленты через запятую'
+        )
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, keepdb=options['keepdb'])
+        databases = runner.setup_databases()
+        try:
+            # Уменьшенные копии фото строятся сразу, чтобы фоновые потоки
+            # не работали во время замеров и после удаления MEDIA_ROOT
+            with TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, IMAGE_PROCESSING_BACKEND='sync'
+            ):
+                self.seed(options)
+                self.seed_feed(options)
+                results = self.run_scenarios(options)
+        finally:
+            runner.teardown_databases(databases)
+            teardown_test_environment()
+        self.report(results)
+        if options['save_baseline']:
+            os.makedirs(
+                os.path.dirname(options['baseline']) or '.', exist_ok=True
+            )
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(
+                f'Базовая линия сохранена: {options["baseline"]}'
+            )
+        elif os.path.exists(options['baseline']):
+            self.compare(results, options)
+
+    def seed(self, options):
+        if Recipe.objects.exists():
+            return
+        call_command('load_ingrs', stdout=StringIO())
+        with TemporaryDirectory() as path:
+            call_command(
+                'generate_fixtures', path,
+                seed=options['seed'],
+                users=options['users'],
+                recipes=options['recipes'],
+                stdout=StringIO()
+            )
+            call_command('load_fixtures', path, stdout=StringIO())
+
+    def get_feed_follows(self, options):
+        return [
+            int(count) for count in options['feed_follows'].split(',')
+            if count
+        ]
+
+    def seed_feed(self, options):
+        follow_counts = self.get_feed_follows(options)
+        if not follow_counts:
+            return
+        authors = list(
+            Recipe.objects.order_by().values_list(
+                'author_id', flat=True
+            ).distinct()
+        )
+        missing = max(follow_counts) - len(authors)
+        if missing > 0:
+            new_authors = User.objects.bulk_create(
+                User(
+                    username=f'feed_author{number}',
+                    email=f'feed_author{number}@example.com'
+                )
+                for number in range(missing)
+            )
+            Recipe.objects.bulk_create(
+                Recipe(
+                    name=f'Рецепт {author.username}',
+                    text='Описание',
+                    cooking_time=15,
+                    author=author
+                )
+                for author in new_authors
+            )
+            authors.extend(author.id for author in new_authors)
+        for count in follow_counts:
+            reader, created = User.objects.get_or_create(
+                username=f'feed_reader{count}',
+                defaults={'email': f'feed_reader{count}@example.com'}
+            )
+            if created:
+                Follow.objects.bulk_create(
+                    Follow(user=reader, author_id=author_id)
+                    for author_id in authors[:count]
+                )
+
+    def get_scenarios(self, options):
+        recipe = Recipe.objects.select_related('author').order_by(
+            'id'
+        ).first()
+        user = recipe.author
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredients = list(Ingredient.objects.values_list('id', flat=True)[:8])
+        recipe_payload = {
+            'name': 'Тестовый рецепт',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': get_image(),
+            'tags': list(Tag.objects.values_list('id', flat=True)[:2]),
+            'ingredients': [
+                {'id': ingredient, 'amount': 10} for ingredient in ingredients
+            ],
+        }
+        tags_query = '&'.join(f'tags={slug}' for slug in tags)
+        scenarios = [
+            ('recipe_list', user, 'get', '/api/recipes/?limit=6', None, None),
+            ('recipe_list_filtered', user, 'get',
+             f'/api/recipes/?limit=6&{tags_query}&is_favorited=1',
+             None, None),
+            ('recipe_detail', user, 'get', f'/api/recipes/{recipe.id}/',
+             None, None),
+            ('subscriptions', user, 'get',
+             '/api/users/subscriptions/?limit=6&recipes_limit=3',
+             None, None),
+            ('download_shopping_cart', user, 'get',
+             '/api/recipes/download_shopping_cart/', None, cache.clear),
+            ('download_shopping_cart_cached', user, 'get',
+             '/api/recipes/download_shopping_cart/', None, None),
+            ('ingredient_autocomplete', user, 'get',
+             '/api/ingredients/autocomplete/?name=сах', None, None),
+            ('recipe_create', user, 'post', '/api/recipes/',
+             recipe_payload, None),
+            ('recipe_update', user, 'patch', f'/api/recipes/{recipe.id}/',
+             recipe_payload, None),
+        ]
+        for count in self.get_feed_follows(options):
+            scenarios.append((
+                f'feed_{count}_follows',
+                User.objects.get(username=f'feed_reader{count}'),
+                'get', '/api/recipes/feed/?limit=6', None, None
+            ))
+        return scenarios
+
+    def run_scenarios(self, options):
+        clients = {}
+        results = {}
+        for name, user, method, url, data, before in self.get_scenarios(
+            options
+        ):
+            if user.id not in clients:
+                clients[user.id] = APIClient()
+                clients[user.id].force_authenticate(user)
+            client = clients[user.id]
+            timings, queries = [], []
+            for attempt in range(options['repeat'] + 1):
+                if before is not None:
+                    before()
+                with CaptureQueriesContext(connection) as context:
+                    started = perf_counter()
+                    response = getattr(client, method)(
+                        url, data, format='json'
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = perf_counter() - started
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f'{name}: {response.status_code} {response.content}'
+                    )
+                if attempt:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(context.captured_queries))
+            results[name] = {
+                **{
+                    f'p{rank}_ms': round(percentile(timings, rank), 3)
+                    for rank in PERCENTILES
+                },
+                'mean_ms': round(mean(timings), 3),
+                'queries': max(queries),
+            }
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"сценарий":<32}'
+            + ''.join(f'{f"p{rank}, мс":>12}' for rank in PERCENTILES)
+            + f'{"запросов":>10}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32}'
+                + ''.join(
+                    f'{result[f"p{rank}_ms"]:>12.2f}' for rank in PERCENTILES
+                )
+                + f'{result["queries"]:>10}'
+            )
+
+    def compare(self, results, options):
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'вместо {expected["queries"]}'
+                )
+            limit = (
+                expected['p50_ms'] * (1 + options['tolerance'])
+                + options['tolerance_ms']
+            )
+            if result['p50_ms'] > limit:
+                regressions.append(
+                    f'{name}: p50 {result["p50_ms"]} мс '
+                    f'вместо {expected["p50_ms"]} мс'
+                )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базовой линии:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
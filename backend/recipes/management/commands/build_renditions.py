@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии фото рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии для всех рецептов'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(renditions={})
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for recipe_id in recipe_ids:
+            build_renditions(recipe_id)
+        self.stdout.write(f'Обработано рецептов: {len(recipe_ids)}')
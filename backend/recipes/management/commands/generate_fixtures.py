@@ -0,0 +1,118 @@
+import json
+import os
+from random import Random
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.constants import MAX_VALUE_TIME
+from recipes.models import Ingredient
+
+WORDS = (
+    'суп', 'салат', 'пирог', 'каша', 'рагу', 'запеканка', 'омлет', 'паста',
+    'быстрый', 'домашний', 'летний', 'острый', 'сырный', 'овощной',
+    'куриный', 'грибной', 'ягодный', 'шоколадный', 'бабушкин', 'простой',
+)
+TAG_NAMES = ('Завтрак', 'Обед', 'Ужин', 'Десерт', 'Перекус', 'Выпечка')
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует воспроизводимый набор данных для load_fixtures: '
+        'пользователей, тэги, рецепты, подписки, избранное и корзины'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Папка для файлов JSONL')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=len(TAG_NAMES))
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows-per-user', type=int, default=10)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--carts-per-user', type=int, default=5)
+
+    def handle(self, *args, **options):
+        ingredients = list(Ingredient.objects.order_by('id').values_list(
+            'name', 'measurement_unit'
+        ))
+        if not ingredients:
+            raise CommandError('Сначала загрузите ингредиенты: load_ingrs')
+        random = Random(options['seed'])
+        users, recipes = options['users'], options['recipes']
+        os.makedirs(options['path'], exist_ok=True)
+        with self.open(options, 'users') as file:
+            for index in range(users):
+                self.write(file, {
+                    'username': f'user{index}',
+                    'email': f'user{index}@example.com',
+                    'first_name': 'Иван',
+                    'last_name': 'Петров',
+                    'password': 'benchmark',
+                })
+        tags = [f'tag{index}' for index in range(options['tags'])]
+        with self.open(options, 'tags') as file:
+            for index, slug in enumerate(tags):
+                self.write(file, {
+                    'name': TAG_NAMES[index % len(TAG_NAMES)] + (
+                        f' {index}' if index >= len(TAG_NAMES) else ''
+                    ),
+                    'color': f'#{index:06X}',
+                    'slug': slug,
+                })
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        with self.open(options, 'recipes') as recipes_file, \
+                self.open(options, 'recipe_ingredients') as amounts_file:
+            for index in range(recipes):
+                self.write(recipes_file, {
+                    'key': f'recipe{index}',
+                    'author': f'user{random.randrange(users)}',
+                    'name': ' '.join(random.sample(WORDS, 3)).capitalize(),
+                    'text': ' '.join(random.choices(WORDS, k=40)),
+                    'cooking_time': random.randint(1, MAX_VALUE_TIME // 8),
+                    'tags': random.sample(
+                        tags, random.randint(1, min(3, len(tags)))
+                    ),
+                })
+                for name, measurement_unit in random.sample(
+                    ingredients, random.randint(1, per_recipe)
+                ):
+                    self.write(amounts_file, {
+                        'recipe': f'recipe{index}',
+                        'ingredient': name,
+                        'measurement_unit': measurement_unit,
+                        'amount': random.randint(1, 500),
+                    })
+        with self.open(options, 'follows') as file:
+            for index in range(users):
+                for author in random.sample(
+                    range(users), min(options['follows_per_user'], users)
+                ):
+                    self.write(file, {
+                        'user': f'user{index}', 'author': f'user{author}'
+                    })
+        for entity, option in (
+            ('favorites', 'favorites_per_user'),
+            ('shopping_carts', 'carts_per_user'),
+        ):
+            with self.open(options, entity) as file:
+                for index in range(users):
+                    for recipe in random.sample(
+                        range(recipes), min(options[option], recipes)
+                    ):
+                        self.write(file, {
+                            'user': f'user{index}',
+                            'recipe': f'recipe{recipe}'
+                        })
+        self.stdout.write(f'Данные записаны в {options["path"]}')
+
+    @staticmethod
+    def open(options, entity):
+        return open(
+            os.path.join(options['path'], f'{entity}.jsonl'), 'w',
+            encoding='utf-8'
+        )
+
+    @staticmethod
+    def write(file, row):
+        file.write(json.dumps(row, ensure_ascii=False) + '\n')
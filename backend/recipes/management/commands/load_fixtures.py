@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+from functools import lru_cache
+from itertools import islice
+from time import monotonic
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.cache import (bump_recipe_ingredients_version,
+                           bump_shopping_cart_version, invalidate_tags_payload)
+from recipes.models import (CountIngredientInRecipe, Favorite, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from recipes.search import update_search_index
+from users.models import Follow, User
+
+DEFAULT_BATCH_SIZE = 2000
+LIST_SEPARATOR = ';'
+
+
+@lru_cache(maxsize=None)
+def hash_password(password):
+    return make_password(password)
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+READERS = (
+    ('.jsonl', read_jsonl),
+    ('.csv', read_csv),
+)
+
+
+def split_list(value):
+    if isinstance(value, list):
+        return value
+    return [item for item in (value or '').split(LIST_SEPARATOR) if item]
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает пользователей, тэги, рецепты, их ингредиенты, подписки, '
+        'избранное и корзины из файлов JSONL или CSV в указанной папке'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Папка с файлами users.jsonl и т.д.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                'База данных не возвращает id при массовой вставке'
+            )
+        self.path = options['path']
+        self.batch_size = options['batch_size']
+        self.users = dict(User.objects.values_list('username', 'id'))
+        self.tags = dict(Tag.objects.values_list('slug', 'id'))
+        self.ingredients = {
+            (name, measurement_unit): ingredient_id
+            for ingredient_id, name, measurement_unit
+            in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        }
+        self.recipes = {}
+        self.cart_users = set()
+        with transaction.atomic():
+            self.load('users', User, self.build_user, self.users)
+            self.load('tags', Tag, self.build_tag, self.tags)
+            self.load(
+                'recipes', Recipe, self.build_recipe, self.recipes,
+                after_batch=self.set_recipe_tags
+            )
+            self.load(
+                'recipe_ingredients', CountIngredientInRecipe,
+                self.build_recipe_ingredient
+            )
+            self.load('follows', Follow, self.build_follow)
+            self.load('favorites', Favorite, self.build_favorite)
+            self.load(
+                'shopping_carts', ShoppingCart, self.build_shopping_cart
+            )
+            Recipe.objects.reconcile_counters()
+            update_search_index(Recipe.objects.all())
+        if self.cart_users:
+            bump_shopping_cart_version(self.cart_users)
+        invalidate_tags_payload()
+        bump_recipe_ingredients_version()
+
+    def read(self, entity):
+        for extension, reader in READERS:
+            path = os.path.join(self.path, entity + extension)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8', newline='') as file:
+                    yield from reader(file)
+                return
+
+    def load(self, entity, model, build, keys=None, after_batch=None):
+        started = monotonic()
+        rows = self.read(entity)
+        total = skipped = 0
+        for batch in iter(lambda: list(islice(rows, self.batch_size)), []):
+            built = []
+            for row in batch:
+                result = build(row)
+                if result is None:
+                    skipped += 1
+                else:
+                    built.append(result)
+            model.objects.bulk_create(
+                [obj for _, obj in built],
+                ignore_conflicts=keys is None
+            )
+            if keys is not None:
+                keys.update((key, obj.id) for key, obj in built)
+            if after_batch is not None:
+                after_batch(built)
+            total += len(built)
+        if total or skipped:
+            elapsed = monotonic() - started
+            self.stdout.write(
+                f'{entity}: загружено {total}, пропущено {skipped}, '
+                f'{elapsed:.2f} с, '
+                f'{total / elapsed if elapsed else total:.0f} строк/с'
+            )
+
+    def build_user(self, row):
+        if row['username'] in self.users:
+            return None
+        password = row.get('password_hash') or hash_password(
+            row.get('password') or row['username']
+        )
+        return row['username'], User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row.get('first_name', ''),
+            last_name=row.get('last_name', ''),
+            password=password
+        )
+
+    def build_tag(self, row):
+        if row['slug'] in self.tags:
+            return None
+        return row['slug'], Tag(
+            name=row['name'], color=row['color'], slug=row['slug']
+        )
+
+    def build_recipe(self, row):
+        author_id = self.users.get(row['author'])
+        if author_id is None or row['key'] in self.recipes:
+            return None
+        recipe = Recipe(
+            author_id=author_id,
+            name=row['name'],
+            text=row['text'],
+            cooking_time=int(row['cooking_time']),
+            image=row.get('image', '')
+        )
+        recipe.tag_ids = [
+            self.tags[slug] for slug in split_list(row.get('tags'))
+            if slug in self.tags
+        ]
+        return row['key'], recipe
+
+    def set_recipe_tags(self, built):
+        Recipe.tags.through.objects.bulk_create(
+            [
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for _, recipe in built
+                for tag_id in recipe.tag_ids
+            ],
+            ignore_conflicts=True
+        )
+
+    def build_recipe_ingredient(self, row):
+        recipe_id = self.recipes.get(row['recipe'])
+        ingredient_id = self.ingredients.get(
+            (row['ingredient'], row['measurement_unit'])
+        )
+        if recipe_id is None or ingredient_id is None:
+            return None
+        return None, CountIngredientInRecipe(
+            recipe_id=recipe_id,
+            ingredient_id=ingredient_id,
+            amount=int(row['amount'])
+        )
+
+    def build_follow(self, row):
+        user_id = self.users.get(row['user'])
+        author_id = self.users.get(row['author'])
+        if user_id is None or author_id is None or user_id == author_id:
+            return None
+        return None, Follow(user_id=user_id, author_id=author_id)
+
+    def build_user_recipe(self, model, row):
+        user_id = self.users.get(row['user'])
+        recipe_id = self.recipes.get(row['recipe'])
+        if user_id is None or recipe_id is None:
+            return None
+        return user_id, model(user_id=user_id, recipe_id=recipe_id)
+
+    def build_favorite(self, row):
+        return self.build_user_recipe(Favorite, row)
+
+    def build_shopping_cart(self, row):
+        result = self.build_user_recipe(ShoppingCart, row)
+        if result is not None:
+            self.cart_users.add(result[0])
+        return result
@@ -1,20 +1,124 @@
+import csv
 import json
+import os
+from itertools import islice
+from time import monotonic
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.cache import bump_ingredients_version
+from recipes.constants import MAX_LENGTH, MAX_LENGTH_MEASUREMENT_UNIT
 from recipes.models import Ingredient
 
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+JSON_SEPARATORS = ' \t\r\n,'
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по частям, не загружая файл целиком"""
+    decoder = json.JSONDecoder()
+    buffer, started = '', False
+    for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), ''):
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and (
+                buffer[position] in JSON_SEPARATORS
+                or not started and buffer[position] == '['
+            ):
+                started = started or buffer[position] == '['
+                position += 1
+            if position == len(buffer) or buffer[position] == ']':
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            if isinstance(item, dict):
+                yield item.get('name'), item.get('measurement_unit')
+            else:
+                yield None, None
+        buffer = buffer[position:]
+    if buffer.strip() not in ('', ']'):
+        raise CommandError('Файл с ингредиентами повреждён')
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1] if len(row) > 1 else None
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из JSON или CSV файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=DEFAULT_PATH)
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Прочитать файл без записи в базу'
+        )
+
+    def parse(self, rows):
+        for name, measurement_unit in rows:
+            if not (
+                isinstance(name, str) and isinstance(measurement_unit, str)
+            ):
+                self.skipped += 1
+                continue
+            name, measurement_unit = name.strip(), measurement_unit.strip()
+            if (
+                not name or not measurement_unit
+                or len(name) > MAX_LENGTH
+                or len(measurement_unit) > MAX_LENGTH_MEASUREMENT_UNIT
+            ):
+                self.skipped += 1
+                continue
+            yield Ingredient(name=name, measurement_unit=measurement_unit)
+
     def handle(self, *args, **options):
-        print('Началась загрузка ингредиентов')
-        with open('data/ingredients.json', encoding='utf-8') as file:
-            ingredients = json.load(file)
-        for ingredient in ingredients:
-            Ingredient.objects.bulk_create([
-                Ingredient(name=ingredient['name']),
-                Ingredient(measurement_unit=ingredient['measurement_unit'])],
-                ignore_conflicts=True
-            )
-
-        print('Загрузка ингредиентов закончилась')
+        path, batch_size = options['path'], options['batch_size']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .json и .csv')
+        if batch_size < 1:
+            raise CommandError('Размер пачки должен быть больше 0')
+        self.stdout.write('Началась загрузка ингредиентов')
+        started = monotonic()
+        before = Ingredient.objects.count()
+        self.skipped = read = batches = 0
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            ingredients = self.parse(reader(file))
+            for batch in iter(
+                lambda: list(islice(ingredients, batch_size)), []
+            ):
+                read += len(batch)
+                batches += 1
+                if not options['dry_run']:
+                    Ingredient.objects.bulk_create(
+                        batch, ignore_conflicts=True
+                    )
+        created = Ingredient.objects.count() - before
+        if created:
+            bump_ingredients_version()
+        elapsed = monotonic() - started
+        self.stdout.write(
+            f'Прочитано: {read}, пропущено: {self.skipped}, '
+            f'добавлено: {created}, пачек: {batches}, '
+            f'время: {elapsed:.2f} с, '
+            f'{read / elapsed if elapsed else read:.0f} строк/с'
+        )
+        self.stdout.write('Загрузка ингредиентов закончилась')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс рецептов'
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        update_search_index(recipes)
+        self.stdout.write(f'Проиндексировано рецептов: {recipes.count()}')
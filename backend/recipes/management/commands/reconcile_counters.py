@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики избранного и корзины у рецептов'
+
+    def handle(self, *args, **options):
+        fixed = Recipe.objects.reconcile_counters()
+        self.stdout.write(f'Исправлено рецептов: {fixed}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from recipes.trending import refresh_scores
+
+
+class Command(BaseCommand):
+    help = 'Обновляет рейтинг популярных рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать рейтинг по всем событиям заново'
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_scores(full=options['full'])
+        self.stdout.write(f'Обновлено рейтингов: {updated}')
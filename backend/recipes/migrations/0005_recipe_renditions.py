@@ -0,0 +1,18 @@
+# Generated by Django 4.0.4 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_alter_countingredientinrecipe_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, verbose_name='Уменьшенные копии фото'),
+        ),
+    ]
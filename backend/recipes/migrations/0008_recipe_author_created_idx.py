@@ -0,0 +1,17 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created', '-id'], name='recipe_author_created_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES = (
+    "SELECT {agg} FROM recipes_countingredientinrecipe AS amount "
+    'JOIN recipes_ingredient AS ingredient '
+    'ON ingredient.id = amount.ingredient_id '
+    'WHERE amount.recipe_id = recipe.id'
+)
+
+POSTGRESQL_FORWARD = (
+    'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    "UPDATE recipes_recipe AS recipe SET search_vector = "
+    "setweight(to_tsvector('russian', recipe.name), 'A') || "
+    "setweight(to_tsvector('russian', COALESCE(("
+    + INGREDIENT_NAMES.format(agg="string_agg(ingredient.name, ' ')")
+    + "), '')), 'B') || "
+    "setweight(to_tsvector('russian', recipe.text), 'C')",
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+)
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts '
+    'USING fts5(name, ingredients, text, '
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    'INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) '
+    'SELECT recipe.id, recipe.name, COALESCE(('
+    + INGREDIENT_NAMES.format(agg="GROUP_CONCAT(ingredient.name, ' ')")
+    + "), ''), recipe.text FROM recipes_recipe AS recipe",
+)
+SQLITE_BACKWARD = (
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+STATEMENTS = {
+    'postgresql': (POSTGRESQL_FORWARD, POSTGRESQL_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run_statements(direction):
+    def run(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            return
+        for statement in statements[direction]:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_author_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(run_statements(0), run_statements(1)),
+    ]
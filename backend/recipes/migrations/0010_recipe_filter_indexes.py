@@ -0,0 +1,23 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:04
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.PositiveSmallIntegerField(db_index=True, validators=[django.core.validators.MinValueValidator(1, 'Время не может быть меньше 1 мин'), django.core.validators.MaxValueValidator(1440, 'Время не может быть больше 1440 мин')], verbose_name='Время'),
+        ),
+        migrations.AddIndex(
+            model_name='countingredientinrecipe',
+            index=models.Index(fields=['ingredient', 'recipe'], name='ingredient_recipe_idx'),
+        ),
+    ]
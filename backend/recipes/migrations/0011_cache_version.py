@@ -0,0 +1,24 @@
+# Generated by Django 4.0.4 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('key', models.CharField(max_length=150, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('version', models.FloatField(verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия кэша',
+                'verbose_name_plural': 'Версии кэша',
+            },
+        ),
+    ]
@@ -1,12 +1,18 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Q,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils import timezone
 
 from recipes.constants import (MAX_LENGTH, MAX_LENGTH_COLOR_HEX,
+                               COUNTERS_BATCH_SIZE,
                                MAX_LENGTH_MEASUREMENT_UNIT, MAX_LENGTH_TEXT,
                                MIN_VALUE_AMOUNT, MAX_VALUE_AMOUNT,
                                MIN_VALUE_TIME, MAX_VALUE_TIME)
-from users.models import User
+from users.models import Follow, User
 
 
 class Ingredient(models.Model):
@@ -60,6 +66,102 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов для чтения через API"""
+
+    def with_user_flags(self, user):
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False)
+            )
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+        )
+
+    def for_read(self, user):
+        queryset = self.with_user_flags(user).defer(
+            'search_vector'
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'countingredientinrecipe',
+                queryset=CountIngredientInRecipe.objects.select_related(
+                    'ingredient'
+                )
+            )
+        )
+        if user is None or user.is_anonymous:
+            return queryset.select_related('author')
+        return queryset.prefetch_related(Prefetch(
+            'author',
+            queryset=User.objects.annotate(subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            ))
+        ))
+
+    def first_by_author(self, author_ids, limit=None):
+        recipes_by_author = {author_id: [] for author_id in author_ids}
+        if not author_ids:
+            return recipes_by_author
+        if not limit:
+            recipes = self.filter(author_id__in=author_ids)
+        else:
+            recipes = self.raw(
+                'SELECT * FROM ('
+                'SELECT recipe.*, ROW_NUMBER() OVER ('
+                'PARTITION BY recipe.author_id '
+                'ORDER BY recipe.created DESC, recipe.id DESC'
+                ') AS row_number '
+                f'FROM {self.model._meta.db_table} AS recipe '
+                'WHERE recipe.author_id IN '
+                f'({", ".join(["%s"] * len(author_ids))})'
+                ') AS ranked WHERE ranked.row_number <= %s '
+                'ORDER BY ranked.author_id, ranked.row_number',
+                [*author_ids, limit]
+            )
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
+        return recipes_by_author
+
+    def change_counter(self, recipe_id, field, delta):
+        return self.filter(pk=recipe_id).update(**{field: F(field) + delta})
+
+    def reconcile_counters(self):
+        counters = {
+            'favorites_count': Favorite,
+            'shopping_cart_count': ShoppingCart,
+        }
+        actual = {
+            f'actual_{field}': count_subquery(model)
+            for field, model in counters.items()
+        }
+        drift = Q()
+        for field in counters:
+            drift |= ~Q(**{field: F(f'actual_{field}')})
+        drifted = [
+            Recipe(pk=pk, **dict(zip(counters, values)))
+            for pk, *values in self.annotate(**actual).filter(
+                drift
+            ).values_list('pk', *actual)
+        ]
+        self.bulk_update(drifted, counters, batch_size=COUNTERS_BATCH_SIZE)
+        return len(drifted)
+
+
+def count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe'
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
 class Recipe(models.Model):
     """Модель рецепта"""
 
@@ -84,6 +186,7 @@ class Recipe(models.Model):
     )
     cooking_time = models.PositiveSmallIntegerField(
         'Время',
+        db_index=True,
         validators=[MinValueValidator(
             MIN_VALUE_TIME, f'Время не может быть меньше {MIN_VALUE_TIME} мин'
         ), MaxValueValidator(
@@ -96,6 +199,11 @@ class Recipe(models.Model):
         upload_to='recipes/',
         blank=True
     )
+    renditions = models.JSONField(
+        'Уменьшенные копии фото',
+        default=dict,
+        blank=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -107,11 +215,33 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'Добавили в избранное',
+        default=0,
+        db_index=True
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        'Добавили в корзину',
+        default=0
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='recipe_author_created_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -126,6 +256,11 @@ class FavoriteAndShoppingCartABS(models.Model):
         User,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        'Дата добавления',
+        default=timezone.now,
+        db_index=True
+    )
 
     class Meta:
         abstract = True
@@ -185,6 +320,12 @@ class CountIngredientInRecipe(models.Model):
                 name='unique_recipe_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['ingredient', 'recipe'],
+                name='ingredient_recipe_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.recipe}{self.ingredient}'
@@ -203,3 +344,50 @@ class ShoppingCart(FavoriteAndShoppingCartABS):
                 name='unique_shoppingcart'
             )
         ]
+
+
+class RecipeScore(models.Model):
+    """Рейтинг популярности рецепта с затуханием по времени"""
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт'
+    )
+    score = models.FloatField(
+        'Рейтинг',
+        default=0,
+        db_index=True
+    )
+    updated = models.DateTimeField('Дата пересчёта')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+    def __str__(self):
+        return f'{self.recipe}{self.score}'
+
+
+class CacheVersion(models.Model):
+    """Версия закэшированных данных, общая для всех процессов.
+
+    Меняется при записи из любого процесса, в том числе из команд
+    manage.py, и сбрасывает снимки в памяти воркеров.
+    """
+
+    key = models.CharField(
+        'Ключ',
+        max_length=MAX_LENGTH,
+        primary_key=True
+    )
+    version = models.FloatField('Версия')
+
+    class Meta:
+        verbose_name = 'Версия кэша'
+        verbose_name_plural = 'Версии кэша'
+
+    def __str__(self):
+        return f'{self.key}{self.version}'
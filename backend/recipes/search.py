@@ -0,0 +1,92 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.contrib.postgres.aggregates import StringAgg
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from recipes.constants import SEARCH_CONFIG, SEARCH_INDEX_BATCH_SIZE
+from recipes.models import CountIngredientInRecipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+
+def ingredient_names():
+    return Coalesce(Subquery(
+        CountIngredientInRecipe.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    ), Value(''))
+
+
+def get_search_vector():
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names(), weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_index(recipes):
+    """Обновляет поисковый индекс для рецептов из выборки"""
+    if connection.vendor == 'postgresql':
+        recipes.update(search_vector=get_search_vector())
+    elif connection.vendor == 'sqlite':
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), SEARCH_INDEX_BATCH_SIZE):
+            update_fts_rows(recipe_ids[start:start + SEARCH_INDEX_BATCH_SIZE])
+
+
+def update_fts_rows(recipe_ids):
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+            'SELECT recipe.id, recipe.name, COALESCE(('
+            "SELECT GROUP_CONCAT(ingredient.name, ' ') "
+            'FROM recipes_countingredientinrecipe AS amount '
+            'JOIN recipes_ingredient AS ingredient '
+            'ON ingredient.id = amount.ingredient_id '
+            "WHERE amount.recipe_id = recipe.id), ''), recipe.text "
+            'FROM recipes_recipe AS recipe '
+            f'WHERE recipe.id IN ({placeholders})',
+            recipe_ids
+        )
+
+
+def get_fts_query(value):
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in value.split()
+    )
+
+
+def search_recipes(queryset, value):
+    """Фильтрует рецепты по запросу и сортирует их по релевантности"""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(
+            value, search_type='websearch', config=SEARCH_CONFIG
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-created')
+    if connection.vendor == 'sqlite':
+        query = get_fts_query(value)
+        if not query:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (query,)
+        )).annotate(search_rank=RawSQL(
+            f'SELECT bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND {FTS_TABLE}.rowid = recipes_recipe.id',
+            (query,)
+        )).order_by('search_rank', '-created')
+    return queryset.filter(name__icontains=value)
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from recipes.cache import (bump_ingredients_version,
+                           bump_recipe_ingredients_version,
+                           bump_shopping_cart_version,
+                           invalidate_tags_payload)
+from recipes.images import schedule_renditions
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from recipes.search import update_search_index
+
+
+def invalidate_shopping_carts(user_ids):
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: bump_shopping_cart_version(user_ids))
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_carts((instance.user_id,))
+
+
+def image_changed(recipe):
+    if not recipe.image._committed or recipe.pk is None:
+        return True
+    return Recipe.objects.filter(pk=recipe.pk).exclude(
+        image=recipe.image.name
+    ).exists()
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_image_changing(sender, instance, update_fields, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._image_changed = image_changed(instance)
+    if instance._image_changed:
+        instance.renditions = {}
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if getattr(instance, '_image_changed', False) and instance.image:
+        schedule_renditions(instance)
+    instance._image_changed = False
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_shopping_carts(ShoppingCart.objects.filter(
+            recipe=instance
+        ).values_list('user_id', flat=True))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_changed(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_shopping_carts(ShoppingCart.objects.filter(
+            recipe__ingredients=instance
+        ).values_list('user_id', flat=True))
+        update_search_index(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    transaction.on_commit(bump_ingredients_version)
+
+
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+def recipe_ingredients_deleted(sender, **kwargs):
+    transaction.on_commit(bump_recipe_ingredients_version)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_tags_payload)
@@ -0,0 +1,55 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from recipes.cache import get_ingredient_snapshot
+from recipes.models import Ingredient
+
+OTHER_PROCESS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class LoadIngredientsTests(TestCase):
+
+    def load(self, extension, content):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ingredients' + extension)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(content)
+            out = StringIO()
+            call_command('load_ingrs', path=path, stdout=out)
+        return out.getvalue()
+
+    def test_short_csv_rows_are_skipped(self):
+        self.load('.csv', 'соль,г\nперец\n\nсахар,г,лишнее\n')
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list('name', flat=True)),
+            ['сахар', 'соль']
+        )
+
+    def test_json_objects_without_fields_are_skipped(self):
+        self.load('.json', (
+            '[{"name": "соль", "measurement_unit": "г"}, '
+            '{"name": "перец"}, {"measurement_unit": "г"}, '
+            '{"name": 1, "measurement_unit": "г"}, "мука"]'
+        ))
+        self.assertEqual(
+            list(Ingredient.objects.values_list('name', flat=True)),
+            ['соль']
+        )
+
+    def test_snapshot_sees_ingredients_loaded_by_another_process(self):
+        self.assertEqual(get_ingredient_snapshot().startswith('со'), [])
+        with override_settings(CACHES=OTHER_PROCESS_CACHES):
+            self.load('.csv', 'соль,г\n')
+        self.assertEqual(
+            [
+                ingredient['name']
+                for ingredient in get_ingredient_snapshot().startswith('со')
+            ],
+            ['соль']
+        )
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from recipes.constants import (TRENDING_BATCH_SIZE,
+                               TRENDING_FAVORITE_WEIGHT,
+                               TRENDING_HALF_LIFE_HOURS, TRENDING_MIN_SCORE,
+                               TRENDING_SHOPPING_CART_WEIGHT)
+from recipes.models import Favorite, RecipeScore, ShoppingCart
+
+EVENTS = (
+    (Favorite, TRENDING_FAVORITE_WEIGHT),
+    (ShoppingCart, TRENDING_SHOPPING_CART_WEIGHT),
+)
+
+
+def decay(since, now):
+    hours = (now - since).total_seconds() / 3600
+    return 0.5 ** (hours / TRENDING_HALF_LIFE_HOURS)
+
+
+def collect_scores(since, now):
+    scores = defaultdict(float)
+    for model, weight in EVENTS:
+        events = model.objects.filter(created__lte=now)
+        if since is not None:
+            events = events.filter(created__gt=since)
+        for recipe_id, created in events.values_list(
+            'recipe_id', 'created'
+        ).iterator(chunk_size=TRENDING_BATCH_SIZE):
+            scores[recipe_id] += weight * decay(created, now)
+    return scores
+
+
+@transaction.atomic
+def refresh_scores(full=False):
+    """Пересчитывает рейтинги рецептов.
+
+    Без full старые рейтинги затухают с момента прошлого пересчёта,
+    а к ним добавляются только новые события избранного и корзины.
+    """
+    now = timezone.now()
+    since = None
+    if not full:
+        since = RecipeScore.objects.aggregate(Max('updated'))['updated__max']
+    if since is None:
+        RecipeScore.objects.all().delete()
+    else:
+        RecipeScore.objects.update(
+            score=F('score') * decay(since, now), updated=now
+        )
+        RecipeScore.objects.filter(score__lt=TRENDING_MIN_SCORE).delete()
+    scores = collect_scores(since, now)
+    existing = RecipeScore.objects.in_bulk(list(scores))
+    for recipe_id, recipe_score in existing.items():
+        recipe_score.score += scores.pop(recipe_id)
+    RecipeScore.objects.bulk_update(
+        existing.values(), ('score',), batch_size=TRENDING_BATCH_SIZE
+    )
+    RecipeScore.objects.bulk_create(
+        (
+            RecipeScore(recipe_id=recipe_id, score=score, updated=now)
+            for recipe_id, score in scores.items()
+            if score >= TRENDING_MIN_SCORE
+        ),
+        batch_size=TRENDING_BATCH_SIZE
+    )
+    return len(existing) + len(scores)